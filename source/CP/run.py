@@ -1,30 +1,39 @@
 import subprocess
-import json
 import os
 import time
-import math
 import argparse
 import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-ALLOWED_SOLVERS = ["gecode", "chuffed", "cp-sat"]
+# Shared helpers live one level up, in source/run_common.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 
-def previous_unsolved(outdir, N, approach_name):
-    prev_n = N - 2
-    prev_file = os.path.join(outdir, f"{prev_n}.json")
+from run_common import (CACHE_DIRNAME, KILL_GRACE_SEC, cache_key, has_no_solution,
+                        kill_process_tree, load_cached_result, load_previous_results,
+                        parse_solution_matrix, previous_unsolved, save_cached_result,
+                        skipped_result, write_json)
 
-    if not os.path.exists(prev_file):
-        return False
+ALLOWED_SOLVERS = ["gecode", "chuffed", "cp-sat"]
 
-    with open(prev_file, "r") as f:
-        data = json.load(f)
+# The output parser and the optimality rule live in these files, so the
+# cache key covers them as well as the model
+RUNNER_PATHS = [
+    Path(__file__).resolve(),
+    Path(__file__).resolve().parent.parent / "run_common.py",
+]
 
-    if approach_name not in data:
-        return False
+# Printed only when the solver has no solution at all
+_NO_SOLUTION_STATUSES = ("=====UNSATISFIABLE=====", "=====UNKNOWN=====")
 
-    return data[approach_name]["sol"] == []
+_OBJ_RE = re.compile(r"^Total Imbalance:[ \t]*(\d+)", re.MULTILINE)
 
-def run_minizinc_model(mzn_file, solver, N, timeout_sec=300):
+def run_minizinc_model(mzn_file, solver, N, timeout_sec=300, verbose=False):
+    # Flattening is left to each run: every solver compiles the model against
+    # its own globals library, so one FlatZinc file cannot be shared across
+    # solvers, and a repeated (model, solver, N) run is served by the cache
     cmd = [
         "minizinc",
         "--solver", solver,
@@ -34,28 +43,73 @@ def run_minizinc_model(mzn_file, solver, N, timeout_sec=300):
         str(mzn_file)
     ]
 
-    start_time = time.time()
+    start_time = time.perf_counter()
 
-    # Execute MiniZinc process and capture output
-    result = subprocess.run(
+    # Execute MiniZinc process and stream its output
+    process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
     )
 
-    end_time = time.time()
+    # MiniZinc enforces --time-limit itself, this only catches a hung process
+    watchdog = threading.Timer(timeout_sec + KILL_GRACE_SEC, kill_process_tree, (process,))
+    watchdog.start()
+
+    # Keep only the latest complete solution block, intermediate solutions
+    # printed by the solver are dropped as soon as a newer one is complete
+    last_block = []
+    current_block = []
+
+    # Status lines are collected over the whole output, one printed before
+    # the last separator would otherwise be dropped with the older blocks
+    status_lines = []
+
+    try:
+        for line in process.stdout:
+            if line.startswith(b"----------"):
+                last_block = current_block
+                current_block = []
+            else:
+                current_block.append(line)
+                if line.startswith(b"====="):
+                    status_lines.append(line)
+        process.wait()
+    except BaseException:
+        # MiniZinc runs in a session of its own, take it down with us
+        kill_process_tree(process)
+        raise
+    finally:
+        watchdog.cancel()
+
+    end_time = time.perf_counter()
 
     # Measure actual runtime
     actual_runtime = end_time - start_time
-    runtime_floor = math.floor(actual_runtime)
+    runtime_floor = int(actual_runtime)
+
+    # Only the retained block is decoded, discarded solutions stay as bytes
+    stdout = b"".join(last_block if last_block else current_block).decode(errors="replace")
+    if verbose:
+        print(stdout)
+
+    status = b"".join(status_lines).decode(errors="replace")
 
-    stdout = result.stdout
-    print(stdout)
+    # A non-zero exit covers both a MiniZinc failure and a watchdog kill.
+    # Such a run says nothing about the model and is not cached
+    answered = process.returncode == 0 and "=====ERROR=====" not in status
+    if not answered:
+        print(f"MiniZinc failed on {mzn_file} with {solver} (exit code {process.returncode})")
+
+    # No solution found, nothing to extract. A solution completed before an
+    # error is still reported, the run is only kept out of the cache
+    if has_no_solution(stdout) or any(marker in status for marker in _NO_SOLUTION_STATUSES):
+        return timeout_sec, False, None, None, answered
 
     # Objective extraction
     obj = None
-    obj_match = re.search(r"Total Imbalance:\s*(\d+)", stdout)
+    obj_match = _OBJ_RE.search(stdout)
     if obj_match:
         obj = int(obj_match.group(1))
 
@@ -64,65 +118,11 @@ def run_minizinc_model(mzn_file, solver, N, timeout_sec=300):
 
     # Optimality detection
     optimal = True
-    if not sol or (obj and obj > N):
+    if not sol or (obj is not None and obj > N):
         optimal = False
         runtime_floor = timeout_sec
 
-    return runtime_floor, optimal, obj, sol
-
-
-def parse_solution_matrix(stdout):
-    # Extract week blocks
-    week_blocks = re.findall(
-        r"Week\s+\d+:(.*?)(?=Week\s+\d+:|Home/Away Balance:|Total Imbalance:|----------|$)",
-        stdout,
-        re.DOTALL
-    )
-
-    if not week_blocks:
-        return None
-
-    weeks = []
-
-    # Extract matches per period for each week
-    for block in week_blocks:
-        period_matches = re.findall(
-            r"Period\s+\d+:\s*(\d+)\s+vs\s+(\d+)",
-            block
-        )
-
-        week_matches = [[int(a), int(b)] for a, b in period_matches]
-
-        if week_matches:
-            weeks.append(week_matches)
-
-    if not weeks:
-        return None
-
-    num_weeks = len(weeks)
-    num_periods = len(weeks[0])
-
-    # Ensure all weeks have same number of periods
-    for w in weeks:
-        if len(w) != num_periods:
-            return None
-
-    # Convert week-major to period-major structure
-    matrix = []
-
-    for p in range(num_periods):
-        row = []
-        for w in range(num_weeks):
-            row.append(weeks[w][p])
-        matrix.append(row)
-
-    # Convert team numbering from 0-based to 1-based
-    for p in range(num_periods):
-        for w in range(num_weeks):
-            for t in range(2):
-                matrix[p][w][t] += 1
-
-    return matrix
+    return runtime_floor, optimal, obj, sol, answered
 
 
 def main():
@@ -156,7 +156,21 @@ def main():
         help="Disable skipping of model-solver pairs that had no solution at N-2."
     )
 
-    parser.set_defaults(skip_non_solvable=True)
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of model-solver pairs to run in parallel (default 1). "
+                             "Parallel runs share the CPU, their times are not benchmark results")
+
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Ignore results cached for an unchanged model, solver, N and timeout."
+    )
+
+    parser.add_argument("--verbose", action="store_true",
+                        help="Print the raw MiniZinc output of every run")
+
+    parser.set_defaults(skip_non_solvable=True, use_cache=True)
 
     args = parser.parse_args()
 
@@ -197,49 +211,82 @@ def main():
         return
 
     results = {}
+    tasks = []
+
+    # Load the N-2 results once for the skip check
+    prev_results = {}
+    if args.skip_non_solvable and args.N > 6:
+        prev_results = load_previous_results(args.outdir, args.N)
+
+    # Collect the model-solver pairs to run
+    cache_dir = os.path.join(args.outdir, CACHE_DIRNAME)
+    runner_bytes = b"".join(path.read_bytes() for path in RUNNER_PATHS)
 
-    # Run each model
     for mzn_file in mzn_files:
         file_name = mzn_file.stem
+        model_bytes = mzn_file.read_bytes()
 
         for solver in solvers_to_use:
 
             approach_name = f"{file_name}-{solver}"
-            print(f"Processing {approach_name} for N={args.N}...")
 
             # Skip logic
             if args.skip_non_solvable and args.N > 6:
-                if previous_unsolved(args.outdir, args.N, approach_name):
+                if previous_unsolved(prev_results, approach_name):
                     print(f"Skipping {approach_name} at N={args.N} (unsolved at N={args.N - 2})")
-                    results[approach_name] = {
-                        "time": args.timeout,
-                        "optimal": False,
-                        "obj": None,
-                        "sol": []
-                    }
+                    results[approach_name] = skipped_result(args.timeout)
+                    continue
+
+            # Reuse the result of an identical earlier run
+            key = cache_key(model_bytes + runner_bytes, solver, args.N, args.timeout)
+            if args.use_cache:
+                cached = load_cached_result(cache_dir, key)
+                if cached is not None:
+                    print(f"Using cached result for {approach_name} at N={args.N}")
+                    results[approach_name] = cached
                     continue
 
-            # Otherwise run normally
-            runtime, optimal, obj, sol = run_minizinc_model(
-                mzn_file=mzn_file,
-                solver=solver,
-                N=args.N,
-                timeout_sec=args.timeout
-            )
-
-            results[approach_name] = {
-                "time": runtime,
-                "optimal": optimal,
-                "obj": obj,
-                "sol": sol if sol else []
-            }
+            # Reserve the slot so the JSON keeps the model/solver order
+            results[approach_name] = None
+            tasks.append((approach_name, mzn_file, solver, key))
+
+    # Run the remaining pairs concurrently, each one is its own MiniZinc process
+    if tasks:
+        max_workers = max(1, min(args.jobs, len(tasks)))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+
+            for approach_name, mzn_file, solver, key in tasks:
+                print(f"Processing {approach_name} for N={args.N}...")
+                future = executor.submit(
+                    run_minizinc_model,
+                    mzn_file=mzn_file,
+                    solver=solver,
+                    N=args.N,
+                    timeout_sec=args.timeout,
+                    verbose=args.verbose
+                )
+                futures[future] = (approach_name, key)
+
+            for future in as_completed(futures):
+                approach_name, key = futures[future]
+                runtime, optimal, obj, sol, answered = future.result()
+
+                results[approach_name] = {
+                    "time": runtime,
+                    "optimal": optimal,
+                    "obj": obj,
+                    "sol": sol if sol else []
+                }
+                if answered:
+                    save_cached_result(cache_dir, key, results[approach_name])
 
     # Save grouped results to JSON
     os.makedirs(args.outdir, exist_ok=True)
     output_path = os.path.join(args.outdir, f"{args.N}.json")
 
-    with open(output_path, "w") as f:
-        json.dump(results, f, indent=4)
+    write_json(output_path, results, indent=True)
 
     print(f"\nSaved grouped results to {output_path}")
 
@@ -1,37 +1,78 @@
+import argparse
+import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared helpers live one level up, in source/run_common.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from run_common import add_batch_arguments
 
 # Configuration
 SCRIPT_NAME = "source/CP/run.py"
 SOURCE_DIR = "source/CP"
 OUTPUT_DIR = "res/CP"
 TIMEOUT = 300
+N_VALUES = range(6, 23, 2)
+
+
+def run_instance(N, timeout=TIMEOUT, skip_non_solvable=True):
+    print("\n==============================")
+    print(f"Launching run for N = {N}")
+    print("==============================")
+
+    cmd = [
+        sys.executable,
+        SCRIPT_NAME,
+        "--dir", SOURCE_DIR,
+        "--N", str(N),
+        "--outdir", OUTPUT_DIR,
+        "--timeout", str(timeout)
+    ]
+
+    if not skip_non_solvable:
+        cmd.append("--no-skip-non-solvable")
+
+    # Let the child write straight to our stdout, and keep sweeping
+    # if one N fails
+    result = subprocess.run(cmd)
+
+    if result.returncode != 0:
+        print(f"Run failed for N = {N}")
+    else:
+        print(f"Completed N = {N}")
+
+    return result.returncode
 
 
 def main():
-    for N in range(6, 23, 2):
-        print("\n==============================")
-        print(f"Launching run for N = {N}")
-        print("==============================")
-
-        cmd = [
-            sys.executable,
-            SCRIPT_NAME,
-            "--dir", SOURCE_DIR,
-            "--N", str(N),
-            "--outdir", OUTPUT_DIR,
-            "--timeout", str(TIMEOUT)
-        ]
-
-        result = subprocess.run(
-            cmd,
-            check=True
-        )
-
-        if result.returncode != 0:
-            print(f"Run failed for N = {N}")
-        else:
-            print(f"Completed N = {N}")
+    parser = argparse.ArgumentParser(
+        description="Run all CP models with all solvers over a range of N (default 6, 8, ..., 22)."
+    )
+
+    add_batch_arguments(parser, N_VALUES, TIMEOUT)
+
+    parser.add_argument(
+        "--no-skip-non-solvable",
+        dest="skip_non_solvable",
+        action="store_false",
+        help="Disable skipping of model-solver pairs that had no solution at N-2."
+    )
+
+    parser.set_defaults(skip_non_solvable=True)
+
+    args = parser.parse_args()
+
+    # N depends on N-2 when skipping, so the sweep has to stay in order
+    if args.skip_non_solvable or args.jobs <= 1:
+        for N in args.n_values:
+            run_instance(N, args.timeout, args.skip_non_solvable)
+        return
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        list(executor.map(lambda N: run_instance(N, args.timeout, skip_non_solvable=False),
+                          args.n_values))
 
 
 if __name__ == "__main__":
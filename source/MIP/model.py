@@ -12,16 +12,147 @@ def register_solver(name):
     return decorator
 
 @register_solver("cbc")
-def _make_cbc(gap):
-    return PULP_CBC_CMD(msg=False, gapRel=gap, threads=1)
+def _make_cbc(gap, threads=1, warm_start=False, time_limit=None):
+    return PULP_CBC_CMD(msg=False, gapRel=gap, threads=threads, warmStart=warm_start,
+                        timeLimit=time_limit)
+
+
+@register_solver("cbc-tuned")
+def _make_cbc_tuned(gap, threads=1, warm_start=False, time_limit=None):
+    # Full presolve, cut generation and primal heuristics, helps on the larger
+    # instances but costs time on the small ones
+    return PULP_CBC_CMD(msg=False, gapRel=gap, threads=threads, warmStart=warm_start,
+                        timeLimit=time_limit, presolve=True, cuts=True,
+                        options=["preprocess on", "heuristics on", "feaspump on"])
+
+
+class _WarmStartHiGHS(HiGHS):
+    """HiGHS through highspy, started from the variables' initial values."""
+
+    def callSolver(self, lp):
+        # PuLP's highspy interface ignores initial values, hand them to HiGHS
+        # as a start solution right before solving
+        import highspy
+
+        col_value = [0.0] * len(lp.variables())
+        for var in lp.variables():
+            col_value[var.index] = var.varValue or 0.0
+
+        start = highspy.HighsSolution()
+        start.col_value = col_value
+        lp.solverModel.setSolution(start)
+
+        super().callSolver(lp)
 
 
 @register_solver("highs")
-def _make_highs(gap):
-    return HiGHS(msg=False, gapRel=gap, threads=1)
+def _make_highs(gap, threads=1, warm_start=False, time_limit=None):
+    solver_class = _WarmStartHiGHS if warm_start else HiGHS
+    return solver_class(msg=False, gapRel=gap, threads=threads, timeLimit=time_limit,
+                        presolve="on", parallel="on" if threads > 1 else "off")
+
+
+# Used when no solver is given on the command line
+DEFAULT_SOLVER = "highs"
+
+
+# Period of each circle-method pair, week by week, for the sizes where the
+# swap used by construct_schedule() breaks the two-games-per-period limit.
+# Found once offline with a CP-SAT search over the period assignment
+_PERIOD_TABLES = {
+    10: [
+        [0, 1, 2, 3, 4],
+        [3, 4, 2, 1, 0],
+        [3, 4, 2, 0, 1],
+        [1, 3, 2, 4, 0],
+        [2, 3, 4, 0, 1],
+        [1, 0, 4, 2, 3],
+        [2, 3, 4, 1, 0],
+        [4, 3, 2, 1, 0],
+        [4, 3, 2, 1, 0],
+    ],
+    16: [
+        [0, 1, 2, 3, 4, 5, 6, 7],
+        [3, 4, 7, 1, 2, 5, 6, 0],
+        [7, 6, 5, 4, 0, 2, 3, 1],
+        [1, 2, 4, 7, 5, 0, 6, 3],
+        [5, 0, 4, 2, 7, 3, 6, 1],
+        [7, 3, 1, 6, 5, 2, 0, 4],
+        [2, 3, 4, 0, 5, 7, 1, 6],
+        [6, 1, 7, 0, 4, 5, 3, 2],
+        [2, 4, 7, 0, 6, 5, 3, 1],
+        [1, 3, 5, 4, 2, 7, 6, 0],
+        [4, 2, 5, 1, 6, 3, 0, 7],
+        [6, 0, 7, 2, 4, 5, 1, 3],
+        [3, 7, 1, 5, 4, 0, 2, 6],
+        [4, 0, 6, 2, 3, 5, 7, 1],
+        [5, 3, 7, 1, 4, 2, 6, 0],
+    ],
+}
+
+
+def _first_is_home(a, b, n):
+    """Orientation of the circle-method pair (a, b) giving every team |home - away| = 1."""
+    if a == n - 1:
+        return b % 2 == 1
+    if b == n - 1:
+        return a % 2 == 0
+    # Rotational orientation of the other n - 1 teams: each one hosts the
+    # (n - 2) / 2 teams that follow it around the circle
+    return 1 <= (b - a) % (n - 1) <= (n - 2) // 2
+
+
+def construct_schedule(n):
+    """
+    Build a schedule with total imbalance n directly from the circle method.
+
+    Returns a result dict shaped like the one of optimize(), or None when the
+    period assignment below does not respect the two-games-per-period limit
+    for this n (it does not when n - 1 is a multiple of 3, n = 10 and 16 are
+    covered by _PERIOD_TABLES).
+    """
+    W = n - 1
+    P = n // 2
+
+    schedule = {}
+    appearances = [[0] * P for _ in range(n)]
+    home_games = [0] * n
+
+    for w in range(W):
+        pairs = [(n - 1, w)] + [((w + p) % W, (w - p) % W) for p in range(1, P)]
+
+        if n in _PERIOD_TABLES:
+            slots = [None] * P
+            for k, p in enumerate(_PERIOD_TABLES[n][w]):
+                slots[p] = pairs[k]
+            pairs = slots
+        else:
+            # Team n - 1 always sits in pair 0, move that pair to a different
+            # period every week so it is spread over all periods
+            k = min(2 * w % W, W - 2 * w % W)
+            pairs[0], pairs[k] = pairs[k], pairs[0]
+
+        schedule[w] = {}
+        for p, (a, b) in enumerate(pairs):
+            appearances[a][p] += 1
+            appearances[b][p] += 1
+
+            home, away = (a, b) if _first_is_home(a, b, n) else (b, a)
+            schedule[w][p] = (home, away)
+            home_games[home] += 1
+
+    if any(count > 2 for row in appearances for count in row):
+        return None
+
+    return {
+        'status': "Optimal",
+        'schedule': schedule,
+        'imbalance': sum(abs(2 * h - W) for h in home_games),
+        'home_away_counts': {t: (home_games[t], W - home_games[t]) for t in range(n)}
+    }
 
 
-def optimize(n, solver_name, gap=0.01):
+def optimize(n, solver_name, gap=0.01, threads=1, warm_start=False, time_limit=None):
     # Validate input
     if n % 2 != 0:
         raise ValueError("Number of teams must be even")
@@ -33,154 +164,131 @@ def optimize(n, solver_name, gap=0.01):
     M = P * W   # total matches
 
     # Generate Round Robin schedule using circle method
-    # rb[p][w][s] gives the team for period p, week w, slot s
-    rb = {}
-    for p in range(P):
-        rb[p] = {}
-        for w in range(W):
-            rb[p][w] = {}
-            for s in range(2):
-                if s == 0:  # Home team
-                    if p == 0:
-                        rb[p][w][s] = n - 1 if w % 2 == 0 else w
-                    else:
-                        rb[p][w][s] = (p + w) % (n - 1)
-                else:  # Away team
-                    if p == 0:
-                        rb[p][w][s] = w if w % 2 == 0 else n - 1
-                    else:
-                        rb[p][w][s] = (n - p + w - 1) % (n - 1)
+    # rb[p][w] gives the (first, second) team pair for period p, week w
+    rb = [[(n - 1, w) if w % 2 == 0 else (w, n - 1) for w in range(W)]]
+    rb += [[((p + w) % (n - 1), (n - p + w - 1) % (n - 1)) for w in range(W)]
+           for p in range(1, P)]
 
-    # Flatten to list of matches: matches[m][0/1]
-    matches = {}
-    match_id = 0
-    for w in range(W):
-        for p in range(P):
-            matches[match_id] = {}
-            matches[match_id][0] = rb[p][w][0]
-            matches[match_id][1] = rb[p][w][1]
-            match_id += 1
+    # Flatten to list of matches, week by week: matches[m][0/1]
+    matches = [rb[p][w] for w in range(W) for p in range(P)]
+
+    # Matches are numbered week by week, so week w owns a contiguous range
+    week_matches = [range(w * P, (w + 1) * P) for w in range(W)]
+
+    # Matches where each team is listed first / second
+    first_of = {t: [] for t in range(n)}
+    second_of = {t: [] for t in range(n)}
+    for m in range(M):
+        first_of[matches[m][0]].append(m)
+        second_of[matches[m][1]].append(m)
+
+    # All W matches of each team
+    matches_of_team = {t: first_of[t] + second_of[t] for t in range(n)}
 
     # Create the model
     model = LpProblem("RoundRobinScheduling", LpMinimize)
 
     # Decision Variables
     # matches_one_hot[m, p, w] = 1 if match m is scheduled in period p of week w
+    # The circle method fixes the week of every match, so only the cells with
+    # w == m // P exist, the solver just picks a period for each match
     matches_one_hot = LpVariable.dicts("matches_oh",
-                              ((m, p, w) for m in range(M) for p in range(P) for w in range(W)),
+                              ((m, p, m // P) for m in range(M) for p in range(P)),
                               cat='Binary')
 
     # first_is_home[m] = 1 if in match m the first team is home (0 if second team is home)
     first_is_home = LpVariable.dicts("first_is_home", range(M), cat='Binary')
 
-    # Linearization: y[m,p,w] = matches_one_hot[m,p,w] * first_is_home[m]
-    y = LpVariable.dicts("y",
-                              ((m, p, w) for m in range(M) for p in range(P) for w in range(W)),
-                              cat='Binary')
-
-    # Home and away counts for each team
-    home_count = LpVariable.dicts("home", range(n), lowBound=0, upBound=W, cat='Integer')
-    away_count = LpVariable.dicts("away", range(n), lowBound=0, upBound=W, cat='Integer')
-
     # Auxiliary variables for absolute differences
-    diff = LpVariable.dicts("diff", range(n), lowBound=0, cat='Integer')
+    # Every team plays W = n - 1 games, an odd number, so home and away can
+    # never be equal and each difference is at least 1
+    diff = LpVariable.dicts("diff", range(n), lowBound=1, cat='Integer')
 
     # Objective variable
     imbalance = LpVariable("imbalance", lowBound=0, cat='Integer')
 
 
-    # Linearization constraints: y[m,p,w] = matches_one_hot[m,p,w] * first_is_home[m]   (if y[m,p,w]=1 then matches m is played with first team home)
-    for m in range(M):
-        for p in range(P):
-            for w in range(W):
-                model += y[m, p, w] <= matches_one_hot[m, p, w], f"lin1_{m}_{p}_{w}"
-                model += y[m, p, w] <= first_is_home[m], f"lin2_{m}_{p}_{w}"
-                model += y[m, p, w] >= matches_one_hot[m, p, w] + first_is_home[m] - 1, f"lin3_{m}_{p}_{w}"
-
     # Constraints
 
     # 1. Each match is played exactly once
     for m in range(M):
-        model += lpSum(matches_one_hot[m, p, w] for p in range(P) for w in range(W)) == 1, f"match_{m}_once"
+        once = LpAffineExpression((matches_one_hot[m, p, m // P], 1) for p in range(P))
+        model += once == 1, f"match_{m}_once"
 
-    # 2. Each period-week slot has exactly one match
-    for p in range(P):
-        for w in range(W):
-            model += lpSum(matches_one_hot[m, p, w] for m in range(M)) == 1, f"slot_{p}_{w}_filled"
-
-    # 3. Matches from week w must be scheduled in week w
+    # 2. Each period-week slot has exactly one match, necessarily of its own
+    # week since no other match can be placed in week w
     for w in range(W):
-        week_matches = list(range(w * P, (w + 1) * P))
         for p in range(P):
-            model += lpSum(matches_one_hot[m, p, w] for m in week_matches) == 1, f"week_{w}_integrity_{p}"
+            filled = LpAffineExpression((matches_one_hot[m, p, w], 1) for m in week_matches[w])
+            model += filled == 1, f"slot_{p}_{w}_filled"
 
-    # 4. Each team plays at most 2 times in each period across all weeks
+    # 3. Each team plays at most 2 times in each period across all weeks
     for p in range(P):
         for t in range(n):
-            appearances = []
-            for w in range(W):
-                for m in range(M):
-                    team1, team2 = matches[m][0], matches[m][1]
-                    if team1 == t or team2 == t:
-                        appearances.append(matches_one_hot[m, p, w])
-
-            if appearances:
-                model += lpSum(appearances) <= 2, f"team_{t}_period_{p}_limit"
+            appearances = LpAffineExpression((matches_one_hot[m, p, m // P], 1)
+                                             for m in matches_of_team[t])
+            model += appearances <= 2, f"team_{t}_period_{p}_limit"
+
+    # 4. Calculate home counts
+    # Every match is played exactly once (constraint 1), so its orientation
+    # alone decides who is home, regardless of the slot it lands in. The counts
+    # are plain expressions, the away count is always W - home_count[t]
+    home_count = {}
+    for t in range(n):
+        # sum(first_is_home[m] for m in first_of[t]) + sum(1 - first_is_home[m] for m in second_of[t])
+        terms = [(first_is_home[m], 1) for m in first_of[t]]
+        terms += [(first_is_home[m], -1) for m in second_of[t]]
+        home_count[t] = LpAffineExpression(terms, constant=len(second_of[t]))
 
-    # 5. Calculate home counts
+    # 5. Calculate absolute differences, home - away = 2 * home - W
     for t in range(n):
-        home_games = []
-        for m in range(M):
-            team1, team2 = matches[m][0], matches[m][1]
-            for p in range(P):
-                for w in range(W):
-                    if team1 == t:
-                        # Team t is home when first_is_home[m] = 1, so use y[m,p,w]
-                        home_games.append(y[m, p, w])
-                    elif team2 == t:
-                        # Team t is home when first_is_home[m] = 0, so use matches_one_hot[m,p,w] - y[m,p,w]
-                        home_games.append(matches_one_hot[m, p, w] - y[m, p, w])
+        model += diff[t] >= 2 * home_count[t] - W, f"diff_{t}_pos"
+        model += diff[t] >= W - 2 * home_count[t], f"diff_{t}_neg"
 
-        model += home_count[t] == lpSum(home_games), f"home_count_{t}"
+    # 6. Total imbalance
+    total = LpAffineExpression([(diff[t], 1) for t in range(n)] + [(imbalance, -1)])
+    model += total == 0, "total_imbalance"
 
-    # 6. Calculate away counts
-    for t in range(n):
-        away_games = []
-        for m in range(M):
-            team1, team2 = matches[m][0], matches[m][1]
-            for p in range(P):
-                for w in range(W):
-                    if team1 == t:
-                        # Team t is away when first_is_home[m] = 0, so use matches_one_hot[m,p,w] - y[m,p,w]
-                        away_games.append(matches_one_hot[m, p, w] - y[m, p, w])
-                    elif team2 == t:
-                        # Team t is away when first_is_home[m] = 1, so use y[m,p,w]
-                        away_games.append(y[m, p, w])
+    # 7. Minimum imbalance, also implied by the bounds on diff
+    model += imbalance >= n, "min_imbalance"
 
-        model += away_count[t] == lpSum(away_games), f"away_count_{t}"
+    # SYMMETRY BREAKING: periods are interchangeable, relabel them so that
+    # match k of week 0 plays in period k
+    for k in week_matches[0]:
+        model += matches_one_hot[k, k, 0] == 1, f"symmetry_week0_{k}"
 
-    # 7. Each team plays exactly W games (home + away = W)
-    for t in range(n):
-        model += home_count[t] + away_count[t] == W, f"team_{t}_total_games"
+    # SYMMETRY BREAKING: flipping every home/away assignment keeps the
+    # imbalance unchanged, so fix the orientation of the first match
+    model += first_is_home[0] == 1, "symmetry_first_home"
 
-    # 8. Calculate absolute differences
-    for t in range(n):
-        model += diff[t] >= home_count[t] - away_count[t], f"diff_{t}_pos"
-        model += diff[t] >= away_count[t] - home_count[t], f"diff_{t}_neg"
+    # Initial solution from the constructive schedule, when it exists for n
+    # It keeps week 0 in circle order, so it satisfies symmetry_week0 as is
+    start = construct_schedule(n) if warm_start else None
 
-    # 9. Total imbalance
-    model += imbalance == lpSum(diff[t] for t in range(n)), "total_imbalance"
+    if start is not None:
+        match_of = {frozenset(pair): m for m, pair in enumerate(matches)}
 
-    # 10. Minimum imbalance
-    model += imbalance >= n, "min_imbalance"
+        for var in matches_one_hot.values():
+            var.setInitialValue(0)
 
-    # SYMMETRY BREAKING: First match (0) goes to period 0, week 0
-    model += matches_one_hot[0, 0, 0] == 1, "symmetry_first_match"
+        home_of = {}
+        for w, week in start['schedule'].items():
+            for p, (home, away) in week.items():
+                m = match_of[frozenset((home, away))]
+                matches_one_hot[m, p, w].setInitialValue(1)
+                home_of[m] = home
 
-    # SYMMETRY BREAKING: lex order between periods
-    for p in range(P - 1):
-        model += (lpSum(m * matches_one_hot[m, p, w] for m in range(M) for w in range(W)) <=
-                  lpSum(m * matches_one_hot[m, p + 1, w] for m in range(M) for w in range(W)))
+        # Flip every orientation if needed to satisfy symmetry_first_home,
+        # the imbalance is the same either way
+        flip = home_of[0] != matches[0][0]
+        for m in range(M):
+            first_is_home[m].setInitialValue(int((home_of[m] == matches[m][0]) != flip))
+
+        for t in range(n):
+            h_val, a_val = start['home_away_counts'][t]
+            diff[t].setInitialValue(abs(h_val - a_val))
+
+        imbalance.setInitialValue(start['imbalance'])
 
     # Objective: Minimize total imbalance
     model += imbalance, "objective"
@@ -192,7 +300,8 @@ def optimize(n, solver_name, gap=0.01):
             + ", ".join(sorted(SOLVERS))
         )
 
-    solver = SOLVERS[solver_name](gap=gap)
+    solver = SOLVERS[solver_name](gap=gap, threads=threads, warm_start=start is not None,
+                                  time_limit=time_limit)
     model.solve(solver)
 
     # Extract results
@@ -204,35 +313,28 @@ def optimize(n, solver_name, gap=0.01):
     }
 
     if LpStatus[model.status] == "Optimal" or LpStatus[model.status] == "Not Solved":
-        schedule = {}
-        for w in range(W):
-            schedule[w] = {}
+        # One pass over the matches, each one only has P cells in its own week
+        schedule = {w: {} for w in range(W)}
+        for m, (team1, team2) in enumerate(matches):
+            w = m // P
             for p in range(P):
-                for m in range(M):
-                    if value(matches_one_hot[m, p, w]) and value(matches_one_hot[m, p, w]) > 0.5:
-                        team1, team2 = matches[m][0], matches[m][1]
-                        h_val = value(first_is_home[m])
-                        if h_val and h_val > 0.5:
-                            home, away = team1, team2
-                        else:
-                            home, away = team2, team1
-                        schedule[w][p] = (home, away)
+                x_val = matches_one_hot[m, p, w].varValue
+                if x_val and x_val > 0.5:
+                    h_val = first_is_home[m].varValue
+                    if h_val and h_val > 0.5:
+                        schedule[w][p] = (team1, team2)
+                    else:
+                        schedule[w][p] = (team2, team1)
+                    break
         result['schedule'] = schedule
 
-        # Get home/away counts
-        home_away_balance = {}
+        # Get home/away counts, home_count[t] is an expression evaluated
+        # from its variables
         for t in range(n):
-            h_val = value(home_count[t])
-            a_val = value(away_count[t])
-            d_val = value(diff[t])
-            home_away_balance[t] = {
-                'home': int(round(h_val)) if h_val else 0,
-                'away': int(round(a_val)) if a_val else 0,
-                'diff': int(round(d_val)) if d_val else 0
-            }
-            result['home_away_counts'][t] = (h_val, a_val)
-
-        imb_val = value(imbalance)
+            h_val = home_count[t].value()
+            result['home_away_counts'][t] = (h_val, W - h_val if h_val is not None else None)
+
+        imb_val = imbalance.varValue
         total_imbalance = int(round(imb_val)) if imb_val else 0
 
         result['imbalance'] = total_imbalance
@@ -286,11 +388,20 @@ def main():
     parser.add_argument("--N", type=int, required=True,
                         help="Number of teams (must be even, >= 6)")
     parser.add_argument("--solver",
-                        required=True,
+                        default=DEFAULT_SOLVER,
                         choices=sorted(SOLVERS),
-                        help=f"Solver backend. Available: {', '.join(sorted(SOLVERS))}")
+                        help=f"Solver backend (default: {DEFAULT_SOLVER}). "
+                             f"Available: {', '.join(sorted(SOLVERS))}")
     parser.add_argument("--gap", type=float, default=0.01,
                         help="MIP optimality gap tolerance (default: 0.01)")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="Threads used by the solver (default: 1)")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="Seed the solver with the constructive schedule when it "
+                             "exists for N")
+    parser.add_argument("--constructive", action="store_true",
+                        help="Build the schedule directly from the circle method when "
+                             "possible and only fall back to the MIP otherwise")
 
     args = parser.parse_args()
     n = args.N
@@ -308,14 +419,19 @@ def main():
     print(f"Matches per week: {n // 2}")
     print(f"Total matches: {(n - 1) * (n // 2)}")
     print(f"Solver: {args.solver}")
+    print(f"Threads: {args.threads}")
     print("\nOptimizing...\n")
 
     try:
-        result = optimize(
-            n,
-            gap=args.gap,
-            solver_name=args.solver
-        )
+        result = construct_schedule(n) if args.constructive else None
+        if result is None:
+            result = optimize(
+                n,
+                gap=args.gap,
+                solver_name=args.solver,
+                threads=args.threads,
+                warm_start=args.warm_start
+            )
         print_schedule(result, n)
 
     except ValueError as e:
@@ -1,156 +1,142 @@
 import argparse
-import subprocess
-import re
 import os
 import sys
-import json
-import time as tm
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
-def previous_unsolved(outdir, N, solver):
-    prev_n = N - 2
-    prev_file = os.path.join(outdir, f"{prev_n}.json")
+# Shared helpers live one level up, in source/run_common.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 
-    if not os.path.exists(prev_file):
-        return False
+from run_common import (CACHE_DIRNAME, cache_key, load_cached_result, load_previous_results,
+                        previous_unsolved, save_cached_result, skipped_result, solve_in_worker,
+                        update_json)
+from model import optimize, print_schedule
 
-    with open(prev_file, "r") as f:
-        data = json.load(f)
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model.py")
+# Result extraction and the optimality rule live here, so the cache key
+# covers this file as well
+RUN_PATH = os.path.abspath(__file__)
 
-    key = f"MIP-{solver}"
 
-    if key not in data:
-        return False
+def _solve(n, solver, timeout, threads, warm_start):
+    return optimize(n, solver, threads=threads, warm_start=warm_start, time_limit=timeout)
 
-    return data[key]["sol"] == []
 
-def parse_solution_matrix(stdout):
-    # Extract week blocks
-    week_blocks = re.findall(
-        r"Week\s+\d+:(.*?)(?=Week\s+\d+:|Home/Away Balance:|Total Imbalance:|----------|$)",
-        stdout,
-        re.DOTALL
-    )
-
-    if not week_blocks:
-        return None
-
-    weeks = []
-
-    # Extract matches per period for each week
-    for block in week_blocks:
-        period_matches = re.findall(
-            r"Period\s+\d+:\s*(\d+)\s+vs\s+(\d+)",
-            block
-        )
-
-        week_matches = [[int(a), int(b)] for a, b in period_matches]
-
-        if week_matches:
-            weeks.append(week_matches)
-
-    if not weeks:
-        return None
+def run_scheduler(n, solver, timeout=300, threads=1, warm_start=False, quiet=False):
+    # Returns (result, answered): answered is False when the result comes
+    # from a crash, a kill or an unreadable schedule rather than from the
+    # solver, such a result must not be cached
+    result = {
+        "time": timeout,
+        "optimal": False,
+        "obj": None,
+        "sol": []
+    }
 
-    num_weeks = len(weeks)
-    num_periods = len(weeks[0])
+    # The model is solved in a worker process, CBC and HiGHS enforce the
+    # time limit themselves
+    outcome, elapsed = solve_in_worker(_solve, (n, solver, timeout, threads, warm_start), timeout)
 
-    # Ensure all weeks have same number of periods
-    for w in weeks:
-        if len(w) != num_periods:
-            return None
+    if isinstance(outcome, TimeoutError):
+        print(f"Timeout: {outcome}")
+        return result, False
 
-    # Convert week-major to period-major structure
-    matrix = []
+    if isinstance(outcome, Exception):
+        print(f"Unexpected error: {outcome}")
+        return result, False
 
-    for p in range(num_periods):
-        row = []
-        for w in range(num_weeks):
-            row.append(weeks[w][p])
-        matrix.append(row)
+    schedule = outcome['schedule']
+    weeks = range(n - 1)
+    periods = range(n // 2)
 
-    # Convert team numbering from 0-based to 1-based
-    for p in range(num_periods):
-        for w in range(num_weeks):
-            for t in range(2):
-                matrix[p][w][t] += 1
+    if outcome['imbalance'] is None or any(len(schedule.get(w, {})) != n // 2 for w in weeks):
+        print("Failed to extract solution.")
+        return result, False
 
-    return matrix
+    if not quiet:
+        print_schedule(outcome, n)
+    imbalance = outcome['imbalance']
 
-def run_scheduler(n, solver, timeout=300):
-    result = {
-        "time": timeout,
-        "optimal": False,
-        "obj": None,
-        "sol": []
-    }
+    # Period-major matrix with 1-based team numbers
+    schedule_matrix = [
+        [[schedule[w][p][0] + 1, schedule[w][p][1] + 1] for w in weeks]
+        for p in periods
+    ]
 
-    start_time = tm.time()
+    # Competition optimality rule: imbalance <= N, found within the time
+    # limit. A worker returning in the kill grace period is too late, the
+    # SAT runner applies the same rule
+    is_optimal = imbalance <= n and elapsed <= timeout
 
-    try:
-        process = subprocess.run(
-            [
-                sys.executable,
-                "source/MIP/model.py",
-                "--N", str(n),
-                "--solver", solver,
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout
-        )
+    if is_optimal:
+        result["time"] = int(elapsed)
+    else:
+        result["time"] = timeout
 
-        elapsed_time = int(tm.time() - start_time)
+    result["optimal"] = is_optimal
+    result["obj"] = imbalance
+    result["sol"] = schedule_matrix
 
-        if process.returncode != 0:
-            print(f"Warning: Solver failed with return code {process.returncode}")
-            if process.stderr:
-                print("STDERR:", process.stderr[:500])
-            return result
+    if imbalance > n:
+        print(f"Warning: Objective {imbalance} > N={n}, setting optimal=False")
+    elif not is_optimal:
+        print(f"Warning: Solution returned after the {timeout} s limit, setting optimal=False")
 
-        print(process.stdout)
+    return result, True
 
-        imbalance = None
-        imbalance_match = re.search(r"TOTAL IMBALANCE:\s*(\d+)", process.stdout)
-        if imbalance_match:
-            imbalance = int(imbalance_match.group(1))
 
-        schedule_matrix = parse_solution_matrix(process.stdout)
+def run_instance(n, args):
+    # output setup
+    output_file = os.path.join(args.outdir, f"{n}.json")
+    key = f"MIP-{args.solver}"
 
-        if imbalance is None or not schedule_matrix:
-            print("Failed to extract solution.")
-            return result
+    # skip check
+    if args.skip_non_solvable and n > 6:
+        if previous_unsolved(load_previous_results(args.outdir, n), key):
+            print(f"Skipping {key} at N={n} (unsolved at N={n - 2})")
+            result = skipped_result(args.timeout)
+            update_json(output_file, {key: result})
 
-        # Competition optimality rule: imbalance <= N
-        is_optimal = imbalance is not None and imbalance <= n
+            print(f"Skipped result saved to: {output_file}")
+            return 0
 
-        if is_optimal:
-            result["time"] = elapsed_time
-        else:
-            result["time"] = timeout
+    # run
+    print(f"\nRunning {key} for N={n}...")
+    print(f"Timeout: {args.timeout} seconds")
+    print(f"Output will be saved to: {output_file}\n")
 
-        result["optimal"] = is_optimal
-        result["obj"] = imbalance
-        result["sol"] = schedule_matrix
+    # Reuse the result of an identical earlier run
+    cache_dir = os.path.join(args.outdir, CACHE_DIRNAME)
+    with open(MODEL_PATH, "rb") as model, open(RUN_PATH, "rb") as runner:
+        run_key = cache_key(model.read() + runner.read(), args.solver, n, args.timeout,
+                            args.threads, args.warm_start)
 
-        if not is_optimal:
-            print(f"Warning: Objective {imbalance} > N={n}, setting optimal=False")
+    result = load_cached_result(cache_dir, run_key) if args.use_cache else None
 
-    except subprocess.TimeoutExpired:
-        print(f"Timeout: Solver exceeded {timeout} seconds")
-        result["time"] = timeout
-        result["optimal"] = False
+    if result is not None:
+        print(f"Using cached result for {key} at N={n}")
+    else:
+        result, answered = run_scheduler(n, args.solver, args.timeout, args.threads,
+                                         args.warm_start, quiet=args.quiet)
+        if answered:
+            save_cached_result(cache_dir, run_key, result)
 
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-        import traceback
-        traceback.print_exc()
-        result["time"] = timeout
-        result["optimal"] = False
+    # Merge into existing file (preserves other solver keys in the same JSON)
+    update_json(output_file, {key: result})
 
-    return result
+    # summary
+    print("\n" + "=" * 60)
+    print("RESULTS SUMMARY")
+    print("=" * 60)
+    print(f"Teams:                        {n}")
+    print(f"Solver:                       {args.solver}")
+    print(f"Time:                         {result['time']} seconds")
+    print(f"Optimal:                      {result['optimal']}")
+    print(f"Objective (Total Imbalance):  {result['obj']}")
+    print(f"Solution:                     {'Found' if result['sol'] else 'Not found'}")
+    print(f"\nResults saved to: {output_file}")
+    print("=" * 60 + "\n")
 
+    return 0 if result['optimal'] else 1
 
 
 def main():
@@ -162,17 +148,19 @@ Examples:
   %(prog)s --N 12 --solver cbc  --outdir results/MIP --timeout 300
   %(prog)s --N 8  --solver highs --outdir results/MIP --timeout 60
   %(prog)s --N 14 --solver highs --outdir results/MIP --no-skip-non-solvable
+  %(prog)s --N 6,8,10,12 --solver cbc --outdir results/MIP --no-skip-non-solvable --jobs 4
         """
     )
 
     parser.add_argument(
-        "--N", type=int, required=True, metavar="N",
-        help="Number of teams (must be even, >= 6)"
+        "--N", type=lambda s: [int(n) for n in s.split(",")], required=True,
+        metavar="N[,N...]",
+        help="Number of teams (must be even, >= 6), or a comma-separated list"
     )
     parser.add_argument(
-        "--solver", type=str, required=True,
-        choices=["cbc", "highs"],
-        help="MIP solver backend"
+        "--solver", type=str, default="highs",
+        choices=["cbc", "cbc-tuned", "highs"],
+        help="MIP solver backend (default: highs)"
     )
     parser.add_argument(
         "--outdir", type=str, default="res", metavar="DIR",
@@ -182,92 +170,66 @@ Examples:
         "--timeout", type=int, default=300, metavar="SECONDS",
         help="Timeout in seconds (default: 300)"
     )
+    parser.add_argument(
+        "--threads", type=int, default=1, metavar="K",
+        help="Threads used by the MIP solver (default: 1)"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, metavar="J",
+        help="Values of N solved in parallel, only used with --no-skip-non-solvable "
+             "(default: 1). Parallel runs share the CPU, their times are not benchmark results"
+    )
+    parser.add_argument(
+        "--warm-start", action="store_true",
+        help="Seed the solver with the constructive circle-method schedule"
+    )
     parser.add_argument(
         "--no-skip-non-solvable",
         dest="skip_non_solvable",
         action="store_false",
         help="Disable skipping when N-2 had an empty solution"
     )
-    parser.set_defaults(skip_non_solvable=True)
+    parser.add_argument(
+        "--quiet", action="store_true",
+        help="Do not print the schedule, only the results summary"
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Ignore results cached for an unchanged model, solver, N and options"
+    )
+    parser.set_defaults(skip_non_solvable=True, use_cache=True)
 
     args = parser.parse_args()
 
     # validation
-    if args.N < 6:
-        print(f"Error: Number of teams must be at least 6 (got {args.N})")
-        sys.exit(1)
-    if args.N % 2 != 0:
-        print(f"Error: Number of teams must be even (got {args.N})")
-        sys.exit(1)
+    for n in args.N:
+        if n < 6:
+            print(f"Error: Number of teams must be at least 6 (got {n})")
+            sys.exit(1)
+        if n % 2 != 0:
+            print(f"Error: Number of teams must be even (got {n})")
+            sys.exit(1)
     if args.timeout <= 0:
         print(f"Error: Timeout must be positive (got {args.timeout})")
         sys.exit(1)
 
-    script_path = Path("source/MIP/model.py")
-    if not script_path.exists():
-        print(f"Error: model.py not found at {script_path}")
-        sys.exit(1)
-
-    # output setup
     os.makedirs(args.outdir, exist_ok=True)
-    output_file = os.path.join(args.outdir, f"{args.N}.json")
-    key = f"MIP-{args.solver}"
-
-    # skip check
-    if args.skip_non_solvable and args.N > 6:
-        if previous_unsolved(args.outdir, args.N, args.solver):
-            print(f"Skipping {key} at N={args.N} (unsolved at N={args.N - 2})")
-            result = {
-                "time": args.timeout,
-                "optimal": False,
-                "obj": None,
-                "sol": []
-            }
-            # Merge into existing file if present, otherwise create it
-            existing = {}
-            if os.path.exists(output_file):
-                with open(output_file, "r") as f:
-                    existing = json.load(f)
-            existing[key] = result
-
-            with open(output_file, "w") as f:
-                json.dump(existing, f, indent=2)
-
-            print(f"Skipped result saved to: {output_file}")
-            sys.exit(0)
-
-    # run
-    print(f"\nRunning {key} for N={args.N}...")
-    print(f"Timeout: {args.timeout} seconds")
-    print(f"Output will be saved to: {output_file}\n")
 
-    result = run_scheduler(args.N, args.solver, args.timeout)
-
-    # Merge into existing file (preserves other solver keys in the same JSON)
-    existing = {}
-    if os.path.exists(output_file):
-        with open(output_file, "r") as f:
-            existing = json.load(f)
-    existing[key] = result
-
-    with open(output_file, "w") as f:
-        json.dump(existing, f, indent=2)
-
-    # summary
-    print("\n" + "=" * 60)
-    print("RESULTS SUMMARY")
-    print("=" * 60)
-    print(f"Teams:                        {args.N}")
-    print(f"Solver:                       {args.solver}")
-    print(f"Time:                         {result['time']} seconds")
-    print(f"Optimal:                      {result['optimal']}")
-    print(f"Objective (Total Imbalance):  {result['obj']}")
-    print(f"Solution:                     {'Found' if result['sol'] else 'Not found'}")
-    print(f"\nResults saved to: {output_file}")
-    print("=" * 60 + "\n")
+    jobs = max(1, args.jobs)
 
-    sys.exit(0 if result['optimal'] else 1)
+    # The skip check at N reads the results of N-2, so the sizes then have
+    # to run one after the other, in increasing order
+    if args.skip_non_solvable or jobs <= 1 or len(args.N) == 1:
+        codes = [run_instance(n, args) for n in sorted(args.N)]
+    else:
+        # Every run already solves in its own worker process, threads are
+        # enough to keep several of them going at once
+        with ThreadPoolExecutor(max_workers=min(jobs, len(args.N))) as executor:
+            codes = list(executor.map(lambda n: run_instance(n, args), args.N))
 
+    sys.exit(max(codes))
 
 if __name__ == "__main__":
     main()
@@ -1,38 +1,117 @@
+import argparse
+import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared helpers live one level up, in source/run_common.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from run_common import add_batch_arguments, skip_unsolved
+
+TIMEOUT = 300
+OUTPUT_DIR = "res/MIP"
+SOLVERS = ["cbc", "highs"]
+ALLOWED_SOLVERS = ["cbc", "cbc-tuned", "highs"]
+N_VALUES = range(6, 23, 2)
+
+
+def run_instance(ns, solver, timeout=TIMEOUT, skip_non_solvable=True, jobs=1):
+    sizes = ",".join(map(str, ns))
+
+    print("=" * 60)
+    print(f"Running instances with n = {sizes} ({solver})")
+    print("=" * 60)
+
+    # One run.py process solves the whole list, the interpreter and the
+    # solver libraries are loaded once per call instead of once per n
+    cmd = [
+        sys.executable,
+        "source/MIP/run.py",
+        "--N", sizes,
+        "--outdir", OUTPUT_DIR,
+        "--timeout", str(timeout),
+        "--solver", solver,
+        "--quiet"
+    ]
+
+    if not skip_non_solvable:
+        cmd += ["--no-skip-non-solvable", "--jobs", str(jobs)]
+
+    try:
+        result = subprocess.run(cmd)
+    except Exception as e:
+        print(f"Unexpected error for n={sizes}: {e}\n")
+        return 1
+
+    if result.returncode != 0:
+        print(f"Instances n={sizes} ({solver}) finished with non-optimal results or errors.\n")
+
+    return result.returncode
+
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Run the MIP model with each solver over a range of N "
+                    "(default cbc and highs for N = 6, 8, ..., 22)."
+    )
+
+    add_batch_arguments(parser, N_VALUES, TIMEOUT, SOLVERS)
+
+    parser.add_argument(
+        "--no-skip-non-solvable",
+        dest="skip_non_solvable",
+        action="store_false",
+        help="Disable skipping of solvers that had no solution at N-2."
+    )
+
+    parser.add_argument("--isolated", action="store_true",
+                        help="Start a separate run.py process for every (N, solver) pair")
+
+    parser.set_defaults(skip_non_solvable=True)
+
+    args = parser.parse_args()
+    jobs = max(1, args.jobs)
+
+    unknown = set(args.solvers) - set(ALLOWED_SOLVERS)
+    if unknown:
+        parser.error(f"unknown solvers: {', '.join(sorted(unknown))}")
+
+    n_values, solvers, timeout = args.n_values, args.solvers, args.timeout
+
+    print(f"\nRunning all instances (n = {n_values.start} to {n_values[-1]})...\n")
+
+    # Both solvers merge their key into the same <n>.json, run.py locks the
+    # file around the merge
+    if args.isolated:
+        # The skip check at n reads the result of n-2, so the sizes of one
+        # solver run in order
+        def run_solver(solver):
+            for n in n_values:
+                if not skip_unsolved(OUTPUT_DIR, n, f"MIP-{solver}", timeout):
+                    run_instance([n], solver, timeout)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            if args.skip_non_solvable:
+                list(executor.map(run_solver, solvers))
+            else:
+                pairs = [(n, solver) for n in n_values for solver in solvers]
+                list(executor.map(
+                    lambda pair: run_instance([pair[0]], pair[1], timeout,
+                                              skip_non_solvable=False),
+                    pairs
+                ))
+    else:
+        # run.py keeps the sizes in order itself when skipping, otherwise it
+        # solves up to its share of the jobs at once
+        per_solver = max(1, jobs // len(solvers))
 
-    timeout = 300
-    outdir = "res/MIP"
-    solvers = ["cbc", "highs"]
-
-    print("\nRunning all instances (n = 6 to 22)...\n")
-
-    for n in range(6, 23, 2):
-        for solver in solvers:
-            print("=" * 60)
-            print(f"Running instance with n = {n}")
-            print("=" * 60)
-
-            try:
-                subprocess.run(
-                    [
-                        sys.executable,
-                        "source/MIP/run.py",
-                        "--N", str(n),
-                        "--outdir", outdir,
-                        "--timeout", str(timeout),
-                        "--solver", solver
-                    ],
-                    check=True
-                )
-
-            except subprocess.CalledProcessError:
-                print(f"Instance n={n} finished with non-optimal result or error.\n")
-
-            except Exception as e:
-                print(f"Unexpected error for n={n}: {e}\n")
+        with ThreadPoolExecutor(max_workers=min(jobs, len(solvers))) as executor:
+            list(executor.map(
+                lambda solver: run_instance(n_values, solver, timeout,
+                                            args.skip_non_solvable, per_solver),
+                solvers
+            ))
 
     print("\nAll runs completed.\n")
 
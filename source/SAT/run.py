@@ -1,135 +1,106 @@
-import subprocess
-import json
 import os
 import time
-import math
 import argparse
-import re
-from pathlib import Path
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
+# Shared helpers live one level up, in source/run_common.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 
+from run_common import (load_previous_results, previous_unsolved, skipped_result, solve_in_worker,
+                        update_json)
+from solve import run
+from solver_backend import DEFAULT_TACTIC, Z3_TACTICS
 
-def previous_unsolved(outdir, N, solver, mode):
-    prev_n = N - 2
-    prev_file = os.path.join(outdir, f"{prev_n}.json")
 
-    if not os.path.exists(prev_file):
-        return False
+def _solve(mode, solver, N, deadline, tactic, quiet):
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
 
-    with open(prev_file, "r") as f:
-        data = json.load(f)
+    # The time limit counts from the start of the worker, the time spent
+    # starting it and building the model is part of the budget
+    return run(N, mode, solver, max(deadline - time.time(), 0), tactic)
 
-    key = f"{solver}-{mode}"
 
-    if key not in data:
-        return False
-
-    return data[key]["sol"] == []
-
-
-def run_model(script_path, mode, solver, N, timeout_sec=300):
-    cmd = [
-        "python",
-        str(script_path),
-        "-n", str(N),
-        "--mode", mode,
-        "--solver", solver
-    ]
+def run_model(mode, solver, N, timeout_sec=300, tactic=DEFAULT_TACTIC, quiet=False):
+    # The model is built and solved in a worker process, the solvers are
+    # imported once by the fork server and inherited
+    outcome, elapsed = solve_in_worker(
+        _solve, (mode, solver, N, time.time() + timeout_sec, tactic, quiet), timeout_sec
+    )
 
-    start_time = time.time()
+    if isinstance(outcome, TimeoutError):
+        return timeout_sec, False, None, []
 
-    try:
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout_sec
-        )
+    if isinstance(outcome, Exception):
+        print(f"Unexpected error: {outcome}")
+        return timeout_sec, False, None, []
 
-    except subprocess.TimeoutExpired:
+    if outcome is None:
         return timeout_sec, False, None, []
 
-    runtime = math.floor(time.time() - start_time)
-    stdout = result.stdout
+    obj, sol = outcome
 
-    print(stdout)
+    # A search stopped by the time limit may return a schedule above the
+    # lower bound N, only a schedule at the bound is known to be optimal.
+    # Building a large model can also overrun the limit before the solver
+    # gets to check it, a schedule found past the limit does not count
+    if (obj is not None and obj > N) or elapsed > timeout_sec:
+        return timeout_sec, False, obj, sol
 
-    # Objective extraction
-    obj = None
-    obj_match = re.search(r"Total Imbalance:\s*(\d+)", stdout)
-    if obj_match:
-        obj = int(obj_match.group(1))
+    return int(elapsed), True, obj, sol
 
-    # Solution extraction
-    sol = parse_solution_matrix(stdout)
 
-    optimal = True
-    if not sol:
-        optimal = False
-        runtime = timeout_sec
+def run_instance(N, args):
+    modes_to_run = ["satisfy", "optimize"] if args.mode == "both" else [args.mode]
 
-    return runtime, optimal, obj, sol
+    results = {}
 
+    # Load the N-2 results once for the skip check
+    prev_results = {}
+    if args.skip_non_solvable and N > 6:
+        prev_results = load_previous_results(args.outdir, N)
 
-def parse_solution_matrix(stdout):
-    # Extract week blocks
-    week_blocks = re.findall(
-        r"Week\s+\d+:(.*?)(?=Week\s+\d+:|Home/Away Balance:|Total Imbalance:|----------|$)",
-        stdout,
-        re.DOTALL
-    )
+    for mode in modes_to_run:
+        key = f"{args.solver}-{mode}"
 
-    if not week_blocks:
-        return None
+        # Skip logic here
+        if args.skip_non_solvable and N > 6:
+            if previous_unsolved(prev_results, key):
+                print(f"Skipping {key} at N={N} (unsolved at N={N-2})")
+                results[key] = skipped_result(args.timeout)
+                continue
 
-    weeks = []
+        print(f"Running {key} for N={N}...")
 
-    # Extract matches per period for each week
-    for block in week_blocks:
-        period_matches = re.findall(
-            r"Period\s+\d+:\s*(\d+)\s+vs\s+(\d+)",
-            block
+        runtime, optimal, obj, sol = run_model(
+            mode,
+            args.solver,
+            N,
+            args.timeout,
+            tactic=args.tactic,
+            quiet=args.quiet
         )
 
-        week_matches = [[int(a), int(b)] for a, b in period_matches]
-
-        if week_matches:
-            weeks.append(week_matches)
-
-    if not weeks:
-        return None
-
-    num_weeks = len(weeks)
-    num_periods = len(weeks[0])
-
-    # Ensure all weeks have same number of periods
-    for w in weeks:
-        if len(w) != num_periods:
-            return None
-
-    # Convert week-major to period-major structure
-    matrix = []
+        results[key] = {
+            "time": runtime,
+            "optimal": optimal,
+            "obj": obj,
+            "sol": sol if sol else []
+        }
 
-    for p in range(num_periods):
-        row = []
-        for w in range(num_weeks):
-            row.append(weeks[w][p])
-        matrix.append(row)
+    output_path = os.path.join(args.outdir, f"{N}.json")
 
-    # Convert team numbering from 0-based to 1-based
-    for p in range(num_periods):
-        for w in range(num_weeks):
-            for t in range(2):
-                matrix[p][w][t] += 1
+    update_json(output_path, results)
 
-    return matrix
+    print(f"\nSaved results to {output_path}")
 
 
 def main():
     parser = argparse.ArgumentParser()
 
-    parser.add_argument("--N", type=int, required=True)
+    parser.add_argument("--N", type=lambda s: [int(n) for n in s.split(",")], required=True,
+                        help="Number of teams, or a comma-separated list of them")
     parser.add_argument("--timeout", type=int, default=300)
     parser.add_argument("--outdir", type=str, default="res")
     parser.add_argument(
@@ -144,6 +115,13 @@ def main():
         choices=["z3", "ortools"],
         required=True
     )
+    parser.add_argument(
+        "--tactic",
+        type=str,
+        choices=list(Z3_TACTICS),
+        default=DEFAULT_TACTIC,
+        help=f"Z3 tactic pipeline, ignored by ortools (default: {DEFAULT_TACTIC})."
+    )
 
     parser.add_argument(
         "--no-skip-non-solvable",
@@ -152,73 +130,42 @@ def main():
         help="Disable skipping if previous N-2 had no solution."
     )
 
-    parser.set_defaults(skip_non_solvable=True)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Values of N solved in parallel, only used with --no-skip-non-solvable "
+             "(default: 1). Parallel runs share the CPU, their times are not benchmark results."
+    )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not echo the solver output."
+    )
 
-    script_path = Path("source/SAT/solve.py")
+    parser.set_defaults(skip_non_solvable=True)
 
-    if not script_path.exists():
-        print("Invalid script path")
-        return
+    args = parser.parse_args()
 
-    if args.N % 2 != 0:
+    if any(N % 2 != 0 for N in args.N):
         print("N must be even")
         return
 
     os.makedirs(args.outdir, exist_ok=True)
 
-    modes_to_run = ["satisfy", "optimize"] if args.mode == "both" else [args.mode]
-
-    results = {}
-
-    for mode in modes_to_run:
-        key = f"{args.solver}-{mode}"
-
-        # Skip logic here
-        if args.skip_non_solvable and args.N > 6:
-            if previous_unsolved(args.outdir, args.N, args.solver, mode):
-                print(f"Skipping {key} at N={args.N} (unsolved at N={args.N-2})")
-                results[key] = {
-                    "time": args.timeout,
-                    "optimal": False,
-                    "obj": None,
-                    "sol": []
-                }
-                continue
-
-        print(f"Running {key}...")
-
-        runtime, optimal, obj, sol = run_model(
-            script_path,
-            mode,
-            args.solver,
-            args.N,
-            args.timeout
-        )
+    jobs = max(1, args.jobs)
 
-        results[key] = {
-            "time": runtime,
-            "optimal": optimal,
-            "obj": obj,
-            "sol": sol if sol else []
-        }
-
-    output_path = os.path.join(args.outdir, f"{args.N}.json")
-
-    if os.path.exists(output_path):
-        with open(output_path, "r") as f:
-            existing = json.load(f)
+    # The skip check at N reads the results of N-2, so the sizes then have
+    # to run one after the other, in increasing order
+    if args.skip_non_solvable or jobs <= 1 or len(args.N) == 1:
+        for N in sorted(args.N):
+            run_instance(N, args)
     else:
-        existing = {}
-
-    existing.update(results)
-
-    with open(output_path, "w") as f:
-        json.dump(existing, f, indent=4)
-
-    print(f"\nSaved results to {output_path}")
-
+        # Every mode already solves in its own worker process, threads are
+        # enough to keep several of them going at once
+        with ThreadPoolExecutor(max_workers=min(jobs, len(args.N))) as executor:
+            list(executor.map(lambda N: run_instance(N, args), args.N))
 
 if __name__ == "__main__":
     main()
@@ -1,61 +1,200 @@
+import argparse
 import subprocess
 import sys
 import os
 import time
-import math
+from concurrent.futures import ThreadPoolExecutor
 
+# Shared helpers live one level up, in source/run_common.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 
-TIMEOUT = 300
-
-
-def main():
-    save_dir = "./res/SAT"
-    os.makedirs(save_dir, exist_ok=True)
-
-    solvers = ["z3", "ortools"]
-    mode = "both"
-
-    for n in range(6, 23, 2):
-
-        print("=" * 60)
-        print(f"Running N={n}")
-        print("=" * 60)
+from run_common import add_batch_arguments, read_json, skip_unsolved
 
-        for solver in solvers:
-            cmd = [
-                sys.executable,
-                "source/SAT/run.py",
-                "--N", str(n),
-                "--mode", mode,
-                "--solver", solver,
-                "--outdir", save_dir,
-                "--timeout", str(TIMEOUT)
-            ]
 
-            start_time = time.time()
-
-            try:
-                result = subprocess.run(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    check=True
-                )
-
-                runtime = math.floor(time.time() - start_time)
-
-                print(f"\n{solver}-{mode} runtime: {runtime}s")
-
-                if result.stdout:
-                    print(result.stdout)
+TIMEOUT = 300
+# Budget of the first pass, only the runs it leaves unsolved get the full timeout
+SHORT_TIMEOUT = 32
+SAVE_DIR = "./res/SAT"
+SOLVERS = ["z3", "ortools"]
+MODES = ["satisfy", "optimize"]
+N_VALUES = range(6, 23, 2)
+
+
+def saved_result(n, solver, mode):
+    try:
+        return read_json(os.path.join(SAVE_DIR, f"{n}.json")).get(f"{solver}-{mode}")
+    except FileNotFoundError:
+        return None
+
+
+def unsolved_sizes(ns, solver, mode):
+    # Sizes of the chain without an optimal result yet, a run skipped
+    # because of n-2 counts as unsolved too
+    sizes = []
+
+    for n in ns:
+        result = saved_result(n, solver, mode)
+        if result is None or not result["optimal"]:
+            sizes.append(n)
+
+    return sizes
+
+
+def known_hard_sizes(ns, solver, mode, timeout):
+    # Sizes an earlier sweep actually ran and left without a solution at the
+    # full timeout, a short first attempt at them would only be wasted.
+    # Skipped placeholders say nothing about how hard a size is
+    sizes = set()
+
+    for n in ns:
+        result = saved_result(n, solver, mode)
+        if (result is not None and not result.get("skipped") and not result["sol"]
+                and result["time"] >= timeout):
+            sizes.add(n)
+
+    return sizes
+
+
+def run_instance(ns, solver, mode, timeout=TIMEOUT, skip_non_solvable=True, jobs=1):
+    sizes = ",".join(map(str, ns))
+
+    # One run.py process solves the whole list, the solvers are imported
+    # once per call instead of once per N
+    cmd = [
+        sys.executable,
+        "source/SAT/run.py",
+        "--N", sizes,
+        "--mode", mode,
+        "--solver", solver,
+        "--outdir", SAVE_DIR,
+        "--timeout", str(timeout),
+        "--quiet"
+    ]
+
+    if not skip_non_solvable:
+        cmd += ["--no-skip-non-solvable", "--jobs", str(jobs)]
+
+    start_time = time.perf_counter()
+
+    # Output is captured and printed in one piece, so runs going on in
+    # parallel do not interleave their logs
+    result = subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+
+    runtime = int(time.perf_counter() - start_time)
+
+    report = ["=" * 60, f"N={sizes} {solver}-{mode} (timeout {timeout}s) runtime: {runtime}s",
+              "=" * 60]
+
+    if result.stdout:
+        report.append(result.stdout)
+
+    if result.stderr:
+        report.append("Errors:")
+        report.append(result.stderr)
+
+    print("\n".join(report))
+
+
+def run_pass(sizes, timeout, args):
+    """
+    Run every (solver, mode) chain over its list of sizes with one timeout.
+    """
+    jobs = max(1, args.jobs)
+    chains = [chain for chain in sizes if sizes[chain]]
+
+    if args.isolated:
+        # The skip check at n reads the result of n-2, so the sizes of one
+        # chain run in order
+        def run_chain(chain):
+            solver, mode = chain
+            for n in sizes[chain]:
+                if not skip_unsolved(SAVE_DIR, n, f"{solver}-{mode}", timeout):
+                    run_instance([n], solver, mode, timeout)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            if args.skip_non_solvable:
+                list(executor.map(run_chain, chains))
+            else:
+                runs = [(n, solver, mode) for solver, mode in chains for n in sizes[solver, mode]]
+                list(executor.map(
+                    lambda run: run_instance([run[0]], run[1], run[2], timeout,
+                                             skip_non_solvable=False),
+                    runs
+                ))
+    else:
+        # run.py keeps the sizes in order itself when skipping, otherwise it
+        # solves up to its share of the jobs at once
+        per_chain = max(1, jobs // max(1, len(chains)))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(chains)))) as executor:
+            list(executor.map(
+                lambda chain: run_instance(sizes[chain], *chain, timeout,
+                                           args.skip_non_solvable, per_chain),
+                chains
+            ))
 
-                if result.stderr:
-                    print("Errors:")
-                    print(result.stderr)
 
-            except subprocess.TimeoutExpired:
-                print(f"Timeout at N={n} ({solver}-{mode})")
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the SAT solvers in both modes over a range of N "
+                    "(default z3 and ortools for N = 6, 8, ..., 22)."
+    )
+
+    add_batch_arguments(parser, N_VALUES, TIMEOUT, SOLVERS)
+
+    parser.add_argument("--short-timeout", type=int, default=SHORT_TIMEOUT,
+                        help=f"Timeout of the first pass in seconds (default {SHORT_TIMEOUT}), "
+                             "unsolved runs are retried with --timeout, so a size that needs "
+                             "the full timeout costs both. Sizes a previous sweep left "
+                             "unsolved at --timeout skip the first pass. 0 runs a single pass")
+
+    parser.add_argument(
+        "--no-skip-non-solvable",
+        dest="skip_non_solvable",
+        action="store_false",
+        help="Disable skipping if previous N-2 had no solution."
+    )
+
+    parser.add_argument("--isolated", action="store_true",
+                        help="Start a separate run.py process for every (N, solver, mode)")
+
+    parser.set_defaults(skip_non_solvable=True)
+
+    args = parser.parse_args()
+
+    unknown = set(args.solvers) - set(SOLVERS)
+    if unknown:
+        parser.error(f"unknown solvers: {', '.join(sorted(unknown))}")
+
+    os.makedirs(SAVE_DIR, exist_ok=True)
+
+    # The skip check reads one key per solver and mode, so each of the four
+    # (solver, mode) chains is independent of the others. They all merge
+    # into the same <n>.json, run.py locks the file around the merge
+    chains = [(solver, mode) for solver in args.solvers for mode in MODES]
+    n_values = list(args.n_values)
+
+    # Most instances take a second or two: a first pass with a short budget
+    # settles them, and only what it leaves unsolved (or skipped after an
+    # unsolved n-2) gets the full timeout. A size that needs the full
+    # timeout pays for both attempts, unless an earlier sweep already
+    # found it unsolvable in time and it goes straight to the second pass
+    if 0 < args.short_timeout < args.timeout:
+        short_sizes = {}
+        for chain in chains:
+            hard = known_hard_sizes(n_values, *chain, args.timeout)
+            short_sizes[chain] = [n for n in n_values if n not in hard]
+
+        run_pass(short_sizes, args.short_timeout, args)
+        run_pass({chain: unsolved_sizes(n_values, *chain) for chain in chains},
+                 args.timeout, args)
+    else:
+        run_pass({chain: n_values for chain in chains}, args.timeout, args)
 
     print("\nBatch execution completed.")
 
@@ -1,4 +1,4 @@
-from itertools import combinations
+from itertools import combinations, count
 
 from z3 import *
 from ortools.sat.python import cp_model
@@ -16,6 +16,14 @@ def is_ortools_backend(solver):
     return hasattr(solver, 'model')
 
 
+# Z3 Bools are identified by name, every auxiliary encoding gets a fresh id
+_aux_ids = count()
+
+# Above this many variables the sequential at-most-one encoding (3n clauses)
+# is smaller than the pairwise one (n(n-1)/2 clauses)
+PAIRWISE_AMO_MAX = 4
+
+
 # Unified encoding functions
 
 def at_least_one(bool_vars, solver=None):
@@ -39,9 +47,12 @@ def at_most_one(bool_vars, solver=None, name=""):
         # OR-Tools has native support
         solver.model.AddAtMostOne(bool_vars)
         return True
-    else:
+    elif len(bool_vars) <= PAIRWISE_AMO_MAX:
         # Z3 - use pairwise encoding
         return And([Not(And(pair[0], pair[1])) for pair in combinations(bool_vars, 2)])
+    else:
+        # Z3 - use sequential encoding
+        return at_most_k_seq_z3(bool_vars, 1, f"amo{next(_aux_ids)}_{name}")
 
 
 def exactly_one(bool_vars, solver=None, name=""):
@@ -128,91 +139,30 @@ def encode_exact_count(solver, indicators, count_vars, max_count, name):
                 solver.model.Add(sum(indicators) == k).OnlyEnforceIf(count_vars[k])
                 solver.model.Add(sum(indicators) != k).OnlyEnforceIf(count_vars[k].Not())
     else:
-        # Z3 version: manual encoding with 4 cases
+        # Z3 version: native pseudo-Boolean equality per count
+        terms = [(ind, 1) for ind in indicators]
         for k in range(max_count + 1):
-            # Case 1: k > len(indicators) -> impossible count
             if k > len(indicators):
+                # Impossible: can't have more true than total indicators
                 solver.add_constraint(Not(count_vars[k]))
-            # Case 2: k == 0 -> all indicators must be false
-            elif k == 0:
-                solver.add_constraint(Implies(count_vars[0], And([Not(ind) for ind in indicators])))
-                if len(indicators) > 0:
-                    solver.add_constraint(Implies(And([Not(ind) for ind in indicators]), count_vars[0]))
-            # Case 3: k == len(indicators) -> all indicators must be true
-            elif k == len(indicators):
-                solver.add_constraint(Implies(count_vars[k], And(indicators)))
-                solver.add_constraint(Implies(And(indicators), count_vars[k]))
-            # Case 4: 0 < k < len(indicators) -> exactly k true
+            elif not indicators:
+                # Nothing to count, the count is 0
+                solver.add_constraint(count_vars[0])
             else:
-                # "At least k true" encoded as "at most (n-k) false"
-                at_least_k = at_most_k_seq_z3([Not(ind) for ind in indicators],
-                                              len(indicators) - k, f'{name}_atleast_{k}')
-                # "At most k true"
-                at_most_k_cond = at_most_k_seq_z3(indicators, k, f'{name}_atmost_{k}')
-                # Bidirectional: count_vars[k] <=> (at_least_k ∧ at_most_k)
-                solver.add_constraint(Implies(count_vars[k], And(at_least_k, at_most_k_cond)))
-                solver.add_constraint(Implies(And(at_least_k, at_most_k_cond), count_vars[k]))
+                # Bidirectional: count_vars[k] <=> (sum == k)
+                solver.add_constraint(count_vars[k] == PbEq(terms, k))
 
 
 def constrain_total_imbalance(solver, diff_vars, T, N, target):
     """Add constraint that sum of all team differences equals target."""
 
+    # diff_vars[t] is one-hot, so the weighted sum of its literals is the
+    # difference of team t
+    terms = [(diff_vars[t][k], k) for t in T for k in range(1, N)]
+
     if is_ortools_backend(solver):
-        # OR-Tools version - pure boolean: enumerate all tuples of per-team
-        # diff values whose sum equals target, then OR the conjunctions.
-        teams = list(T)
-
-        def _enum_combos(idx, remaining):
-            """Yield all assignments (list of (team, k) pairs) that sum to `remaining`."""
-            if idx == len(teams):
-                if remaining == 0:
-                    yield []
-                return
-            t = teams[idx]
-            for k in range(min(N, remaining + 1)):
-                for rest in _enum_combos(idx + 1, remaining - k):
-                    yield [(t, k)] + rest
-
-        combo_literals = []
-        for combo in _enum_combos(0, target):
-            # Each combo is a list of (team, diff_value) pairs
-            conjuncts = [diff_vars[t][k] for t, k in combo]
-            if len(conjuncts) == 1:
-                combo_literals.append(conjuncts[0])
-            else:
-                # Introduce an auxiliary bool that is true iff all conjuncts hold
-                aux = solver.model.NewBoolVar(f'combo_{"_".join(f"{t}d{k}" for t, k in combo)}')
-                solver.model.AddBoolAnd(conjuncts).OnlyEnforceIf(aux)
-                solver.model.AddBoolOr([v.Not() for v in conjuncts]).OnlyEnforceIf(aux.Not())
-                combo_literals.append(aux)
-
-        if combo_literals:
-            solver.model.AddBoolOr(combo_literals)
-        else:
-            # No valid combination exists — force UNSAT
-            f = solver.model.NewBoolVar('unsat_flag')
-            solver.model.Add(f == 1)
-            solver.model.Add(f == 0)
+        # OR-Tools version - native linear constraint
+        solver.model.Add(sum(k * var for var, k in terms) == target)
     else:
-        # Z3 version - enumerate valid combinations
-        def find_combinations(teams_left, current_sum, current_assignment):
-            if teams_left == 0:
-                if current_sum == target:
-                    yield current_assignment
-                return
-            for diff in range(min(N, target - current_sum + 1)):
-                yield from find_combinations(teams_left - 1, current_sum + diff,
-                                             current_assignment + [diff])
-
-        valid_combinations = list(find_combinations(N, 0, []))
-
-        if not valid_combinations:
-            solver.add_constraint(False)
-            return
-
-        combination_constraints = []
-        for combo in valid_combinations:
-            combo_constraint = And([diff_vars[t][combo[t]] for t in T])
-            combination_constraints.append(combo_constraint)
-
-        solver.add_constraint(Or(combination_constraints))
+        # Z3 version - pseudo-Boolean equality
+        solver.add_constraint(PbEq(terms, target))
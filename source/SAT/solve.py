@@ -1,8 +1,9 @@
 import argparse
+import sys
 import time
 
 from sat_encodings import *
-from solver_backend import create_solver, ORToolsBackend
+from solver_backend import DEFAULT_TACTIC, Z3_TACTICS, create_solver, ORToolsBackend
 from utils import *
 
 
@@ -61,15 +62,24 @@ def add_core_constraints(solver, N, T, S, W, P, M, match_pairs, matches_idx_vars
                 at_most_k(team_appears, 2, solver, f'amt2_t{team}_p{period}')
 
 
-def satisfy(N, backend='z3'):
+def limit_time(solver, deadline):
+    """
+    Give the next check whatever is left until the deadline, if any.
+    """
+    if deadline is not None:
+        solver.set_time_limit(deadline - time.time())
+
+
+def satisfy(N, backend='z3', timeout=None, tactic=DEFAULT_TACTIC):
     assert N % 2 == 0, "Number of teams must be even"
+    deadline = time.time() + timeout if timeout is not None else None
 
     # Parameters
     T, S, W, P, M = calculate_params(N)
     rb, matches = generate_rb_and_flattened(N, W, P, S)
 
     # Create solver with specified backend
-    solver = create_solver(backend)
+    solver = create_solver(backend, tactic)
 
     # Decision variables: matches_idx[p][w] using one-hot encoding
     matches_idx_vars = {}
@@ -82,6 +92,7 @@ def satisfy(N, backend='z3'):
     add_core_constraints(solver, N, T, S, W, P, M, matches, matches_idx_vars)
 
     # Solve
+    limit_time(solver, deadline)
     start_time = time.time()
     result = solver.check()
     elapsed_time = time.time() - start_time
@@ -104,14 +115,15 @@ def satisfy(N, backend='z3'):
         return None, elapsed_time
 
 
-def optimize(N, backend='z3'):
+def optimize(N, backend='z3', timeout=None, tactic=DEFAULT_TACTIC):
     assert N % 2 == 0, "Number of teams must be even"
+    deadline = time.time() + timeout if timeout is not None else None
 
     T, S, W, P, M = calculate_params(N)
     rb, match_pairs = generate_rb_and_flattened(N, W, P, S)
 
     # Create solver
-    solver = create_solver(backend)
+    solver = create_solver(backend, tactic)
 
     # Decision variables: matches_idx[p][w] using one-hot encoding
     matches_idx_vars = {}
@@ -250,6 +262,7 @@ def optimize(N, backend='z3'):
     if isinstance(solver, ORToolsBackend):
         solver.minimize(sum(d * diff_vars[t][d] for t in T for d in range(N)))
 
+        limit_time(solver, deadline)
         start_time = time.time()
         result = solver.check()
         elapsed_time = time.time() - start_time
@@ -290,6 +303,7 @@ def optimize(N, backend='z3'):
             solver.push()
             constrain_total_imbalance(solver, diff_vars, T, N, target)
 
+            limit_time(solver, deadline)
             result = solver.check()
             if result == 'SAT':
                 elapsed_time = time.time() - start_time
@@ -304,10 +318,31 @@ def optimize(N, backend='z3'):
                 return best_solution, elapsed_time
             solver.pop()
 
+            # Out of time, larger targets would not get a real attempt
+            if result == 'UNKNOWN':
+                break
+
         elapsed_time = time.time() - start_time
         return best_solution, elapsed_time
 
 
+def run(N, mode, backend='z3', timeout=None, tactic=DEFAULT_TACTIC):
+    """
+    Solve one instance, return (objective, period-major 1-based matrix) or None.
+    """
+    if mode == "satisfy":
+        solution, _ = satisfy(N, backend, timeout, tactic)
+    else:
+        solution, _ = optimize(N, backend, timeout, tactic)
+
+    if solution is None:
+        return None
+
+    T, S, W, P, M = calculate_params(N)
+    rb, match_pairs = generate_rb_and_flattened(N, W, P, S)
+    return solution['imbalance'], solution_matrix(P, W, match_pairs, solution)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Round-robin scheduling using SAT encodings."
@@ -336,6 +371,21 @@ def main():
         help="Solver backend to use: 'z3' or 'ortools' (default: z3)"
     )
 
+    parser.add_argument(
+        "-t", "--timeout",
+        type=float,
+        default=None,
+        help="Time limit in seconds, enforced by the solver (default: none)"
+    )
+
+    parser.add_argument(
+        "--tactic",
+        type=str,
+        choices=list(Z3_TACTICS),
+        default=DEFAULT_TACTIC,
+        help=f"Z3 tactic pipeline, 'plain' is Z3's default solver (default: {DEFAULT_TACTIC})"
+    )
+
     args = parser.parse_args()
 
     N = args.n
@@ -354,10 +404,7 @@ def main():
     print(f"Running with N = {N}, mode = {mode}, backend = {backend}")
 
     # Run with specified backend
-    if mode == "satisfy":
-        satisfy(N, backend)
-    elif mode == "optimize":
-        optimize(N, backend)
+    run(N, mode, backend, args.timeout, args.tactic)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,16 @@
 from z3 import *
 from ortools.sat.python import cp_model
 
+# Tactic pipelines the Z3 solver can be built from, None is Z3's own
+# default solver. "sat" turns the cardinality constraints into clauses and
+# hands the whole problem to the SAT core, which is much faster on this model
+Z3_TACTICS = {
+    "plain": None,
+    "smt": ('simplify', 'propagate-values', 'solve-eqs', 'smt'),
+    "sat": ('simplify', 'propagate-values', 'card2bv', 'simplify', 'bit-blast', 'sat'),
+}
+DEFAULT_TACTIC = "sat"
+
 
 class SolverBackend:
 
@@ -25,11 +35,15 @@ class SolverBackend:
     def minimize(self, objective):
         raise NotImplementedError
 
+    def set_time_limit(self, seconds):
+        raise NotImplementedError
+
 
 class Z3Backend(SolverBackend):
 
-    def __init__(self):
-        self.solver = Solver()
+    def __init__(self, tactic=DEFAULT_TACTIC):
+        pipeline = Z3_TACTICS[tactic]
+        self.solver = Then(*pipeline).solver() if pipeline else Solver()
         self._model = None
 
     def create_bool_var(self, name):
@@ -60,6 +74,10 @@ class Z3Backend(SolverBackend):
     def minimize(self, objective):
         return None
 
+    def set_time_limit(self, seconds):
+        # Applies to every following check, which returns unknown when hit
+        self.solver.set("timeout", max(1, int(seconds * 1000)))
+
     def evaluate(self, var):
         """Evaluate a variable in the current model."""
         if self._model is None:
@@ -148,6 +166,10 @@ class ORToolsBackend(SolverBackend):
         self.model.Minimize(objective)
         return objective
 
+    def set_time_limit(self, seconds):
+        """Stop the search after the given wall time, keeping the best solution found."""
+        self.solver.parameters.max_time_in_seconds = max(seconds, 0.001)
+
     def evaluate(self, var):
         """Evaluate a variable in the solution."""
         if self._last_status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
@@ -166,9 +188,9 @@ class ORToolsBackend(SolverBackend):
         }
 
 
-def create_solver(backend='z3'):
+def create_solver(backend='z3', tactic=DEFAULT_TACTIC):
     if backend.lower() == 'z3':
-        return Z3Backend()
+        return Z3Backend(tactic)
     elif backend.lower() == 'ortools':
         return ORToolsBackend()
     else:
@@ -137,16 +137,7 @@ def extract_solution(
     }
 
 
-def format_json(
-        P,
-        W,
-        match_pairs,
-        extracted_solution,
-        runtime,
-        approach_name,
-        is_optimal=True,
-        objective_value=None
-):
+def solution_matrix(P, W, match_pairs, extracted_solution):
     solution = extracted_solution['solution']
     home_first = extracted_solution.get('home_first', {})
 
@@ -176,6 +167,21 @@ def format_json(
 
         sol_matrix.append(period_row)
 
+    return sol_matrix
+
+
+def format_json(
+        P,
+        W,
+        match_pairs,
+        extracted_solution,
+        runtime,
+        approach_name,
+        is_optimal=True,
+        objective_value=None
+):
+    sol_matrix = solution_matrix(P, W, match_pairs, extracted_solution)
+
     # Floor the runtime
     time_floored = int(runtime)
 
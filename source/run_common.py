@@ -0,0 +1,285 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import signal
+import time
+from queue import Empty
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Subdirectory of the output directory holding memoized run results
+CACHE_DIRNAME = ".cache"
+
+# Extra seconds granted to a solver past its own time limit before its
+# process is terminated
+KILL_GRACE_SEC = 10
+
+# The reported times are wall-clock, runs in parallel compete for the CPU
+# and are no longer comparable, so one at a time unless asked otherwise
+DEFAULT_JOBS = 1
+
+# MiniZinc schedule output: "Week <w>:" blocks of "Period <p>: <home> vs <away>"
+_PERIOD_RE = re.compile(r"Period \d+:\s*(\d+) vs (\d+)")
+_BLOCK_TERMINATORS = ("Home/Away Balance:", "Total Imbalance:", "----------")
+
+# Status lines MiniZinc prints instead of a solution
+_NO_SOLUTION_MARKERS = ("=====UNSATISFIABLE=====", "=====UNKNOWN=====", "=====ERROR=====")
+
+
+def read_json(path):
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_json(path, data, indent=False):
+    # Write next to the target and rename over it, so a concurrent reader
+    # sees either the old file or the new one, never a partial write
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(data, option=option))
+    else:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2 if indent else None)
+
+    os.replace(tmp_path, path)
+
+
+def update_json(path, results, indent=True):
+    # Several runners may merge their keys into the same <N>.json at once,
+    # the read-modify-write is serialized through an exclusive lock file
+    with open(path + ".lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        try:
+            existing = read_json(path)
+        except FileNotFoundError:
+            existing = {}
+
+        existing.update(results)
+        write_json(path, existing, indent=indent)
+
+
+def kill_process_tree(process):
+    # Solvers start children of their own (CBC, the fzn-* binaries), the
+    # runners start them as process group leaders so the whole group can go
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        process.kill()
+
+
+def worker_context():
+    # The runners start solve workers from thread pool threads, and forking
+    # a multi-threaded process can deadlock on locks other threads hold.
+    # The fork server is a separate single-threaded process that preloads
+    # the runner's __main__ module, so the solvers are still imported once
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+
+    return multiprocessing.get_context("spawn")
+
+
+def _worker_main(queue, target, args):
+    # Lead a process group of our own, so a timeout takes down anything the
+    # solver started as well (CBC, for one, runs as a child process)
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    try:
+        queue.put(target(*args))
+    except Exception as e:
+        queue.put(e)
+
+
+def solve_in_worker(target, args, timeout):
+    """
+    Run target(*args) in a worker process, return (outcome, elapsed seconds).
+
+    outcome is what target returned, the exception it raised, or a
+    TimeoutError if the worker was still running KILL_GRACE_SEC past the
+    timeout and had to be killed. The solver is expected to enforce the
+    time limit itself, the kill only catches a hung worker.
+    """
+    context = worker_context()
+    queue = context.Queue()
+    process = context.Process(target=_worker_main, args=(queue, target, args))
+
+    start_time = time.perf_counter()
+    process.start()
+
+    try:
+        outcome = queue.get(timeout=timeout + KILL_GRACE_SEC)
+    except Empty:
+        kill_process_tree(process)
+        process.join()
+        return TimeoutError(f"Solver exceeded {timeout} seconds"), time.perf_counter() - start_time
+    except BaseException:
+        # The worker leads its own process group, Ctrl-C does not reach it
+        kill_process_tree(process)
+        raise
+
+    process.join()
+    return outcome, time.perf_counter() - start_time
+
+
+def cache_key(model_bytes, *params):
+    digest = hashlib.blake2b(model_bytes)
+    digest.update("|".join(str(p) for p in params).encode())
+    return digest.hexdigest()[:16]
+
+
+def load_cached_result(cache_dir, key):
+    try:
+        return read_json(os.path.join(cache_dir, f"{key}.json"))
+    except FileNotFoundError:
+        return None
+
+
+def save_cached_result(cache_dir, key, result):
+    os.makedirs(cache_dir, exist_ok=True)
+    write_json(os.path.join(cache_dir, f"{key}.json"), result)
+
+
+def load_previous_results(outdir, N):
+    prev_n = N - 2
+    prev_file = os.path.join(outdir, f"{prev_n}.json")
+
+    try:
+        return read_json(prev_file)
+    except FileNotFoundError:
+        return {}
+
+
+def previous_unsolved(prev_results, key):
+    if key not in prev_results:
+        return False
+
+    return prev_results[key]["sol"] == []
+
+
+def skipped_result(timeout):
+    # Placeholder for a size that was not attempted; "skipped" keeps it apart
+    # from a run that really ended without a solution
+    return {"time": timeout, "optimal": False, "obj": None, "sol": [], "skipped": True}
+
+
+def skip_unsolved(outdir, n, key, timeout):
+    # Unsolved at n-2: the batch drivers record the skip themselves instead
+    # of starting run.py just to have it do the same
+    if n <= 6 or not previous_unsolved(load_previous_results(outdir, n), key):
+        return False
+
+    update_json(os.path.join(outdir, f"{n}.json"), {key: skipped_result(timeout)})
+    print(f"Skipping {key} at N={n} (unsolved at N={n - 2})")
+    return True
+
+
+def parse_n_range(text):
+    try:
+        n_values = range(*(int(x) for x in text.split(",")))
+    except (TypeError, ValueError):
+        raise argparse.ArgumentTypeError(f"expected START,STOP[,STEP], got {text!r}")
+
+    if not n_values:
+        raise argparse.ArgumentTypeError(f"{text!r} gives no values of N")
+    if any(n < 6 or n % 2 != 0 for n in n_values):
+        raise argparse.ArgumentTypeError(f"{text!r} gives odd values of N or values below 6")
+
+    return n_values
+
+
+def add_batch_arguments(parser, n_values, timeout, solvers=None):
+    # Sweep options shared by the run_all.py drivers
+    parser.add_argument(
+        "--n-range", dest="n_values", metavar="START,STOP[,STEP]",
+        type=parse_n_range,
+        default=n_values,
+        help=f"Values of N, as passed to range() (default {n_values.start},"
+             f"{n_values.stop},{n_values.step})"
+    )
+    parser.add_argument("--timeout", type=int, default=timeout,
+                        help=f"Timeout in seconds per instance (default {timeout})")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Number of runs in parallel (default {DEFAULT_JOBS}). With "
+                             "skipping on, the sizes of one sweep still run in order, "
+                             "since the skip check at N reads the results of N-2")
+
+    if solvers is not None:
+        parser.add_argument("--solvers", type=lambda s: s.split(","), default=solvers,
+                            metavar="SOLVER[,SOLVER...]",
+                            help=f"Solvers to run (default {','.join(solvers)})")
+
+
+def has_no_solution(stdout):
+    return any(marker in stdout for marker in _NO_SOLUTION_MARKERS)
+
+
+def parse_solution_matrix(stdout):
+    if has_no_solution(stdout):
+        return None
+
+    # Scan line by line, collecting the period lines of each week block
+    weeks = []
+    current_week = None
+
+    for line in stdout.splitlines():
+        line = line.strip()
+
+        if line.startswith("Week ") and line.endswith(":"):
+            if current_week:
+                weeks.append(current_week)
+            current_week = []
+
+        elif line.startswith(_BLOCK_TERMINATORS):
+            if current_week:
+                weeks.append(current_week)
+            current_week = None
+
+        elif current_week is not None and line:
+            # Anything but a period line inside a week block means the
+            # output is not the schedule we expect, better no solution
+            # than a wrong one
+            match = _PERIOD_RE.fullmatch(line)
+            if match is None:
+                return None
+            current_week.append([int(match.group(1)), int(match.group(2))])
+
+    if current_week:
+        weeks.append(current_week)
+
+    if not weeks:
+        return None
+
+    # Ensure all weeks have same number of periods, zip() would silently
+    # truncate to the shortest week otherwise
+    num_periods = len(weeks[0])
+    if any(len(w) != num_periods for w in weeks):
+        return None
+
+    # Convert week-major to period-major structure and team numbering
+    # from 0-based to 1-based in a single pass
+    matrix = [
+        [[home + 1, away + 1] for home, away in period]
+        for period in zip(*weeks)
+    ]
+
+    return matrix